@@ -1,15 +1,30 @@
-import base64
+import hashlib
 import json
 import math
 import os
+import re
 import time
-from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from html import escape
 from io import BytesIO
 from pathlib import Path
-from urllib.parse import urlparse
+from typing import Iterator
+from urllib.parse import quote, urlparse
 
-from PIL import Image
+import numpy as np
+import PIL
+from PIL import Image, features
+
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON, stdlib fallback below
+    orjson = None
+
+try:
+    from pybase64 import b64encode as _b64encode
+except ImportError:  # Optional: SIMD base64, stdlib fallback
+    from base64 import b64encode as _b64encode
 
 # Project paths
 ROOT = Path(__file__).resolve().parents[1]
@@ -20,23 +35,35 @@ TEMPLATE = ROOT / "scripts" / "templates" / "index.template.html"
 DIST_DIR = ROOT / "dist"
 OUT_HTML = DIST_DIR / "index.html"
 
+# Build cache (kept out of dist/, which is deployed as-is)
+CACHE_DIR = ROOT / ".cache"
+ICON_CACHE_DIR = CACHE_DIR / "icons"
+ICON_CACHE_VERSION = 2  # Bump when icon normalization changes
+BUILD_STAMP = CACHE_DIR / "build_stamp"
+
 # Sprite config
 ICON_SIZE = 24
 SPRITE_COLS = 12  # Adjust freely
 SPRITE_WEBP_QUALITY = 85
+SPRITE_WEBP_METHOD = 2  # 0-6 effort; 2 ~ size of 4 at about half the encode time
 SPRITE_JPG_QUALITY = 85
+# Also try a 256-color palette + lossless WebP and keep whichever is smaller.
+# Favicons have few colors, so this usually wins on both size and fidelity.
+SPRITE_WEBP_TRY_PALETTE = True
+# Sprites larger than this (encoded bytes) are written as dist/sprite.<hash>.webp
+# and referenced by URL instead of being inlined: smaller, cacheable HTML. None means
+# always inline, which keeps index.html a single self-contained file.
+SPRITE_INLINE_MAX_BYTES: int | None = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Site:
     name: str
     url: str
     category: str
     tags: list[str]
-    # If icon exists, build.py will set icon_x/icon_y and icon_color.
-    icon_x: int | None = None
-    icon_y: int | None = None
-    icon_color: str | None = None
+    # Parsed hostname of url, filled by load_sites(). Not part of the payload.
+    host: str = ""
 
 
 def build_version_unix() -> str:
@@ -61,11 +88,24 @@ def _strip_www(host: str) -> str:
     return host[4:] if host.startswith("www.") else host
 
 
+def _loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def _dumps(obj) -> bytes:
+    # UTF-8 JSON; orjson emits non-ASCII as-is, same as ensure_ascii=False
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
 def load_sites() -> list[Site]:
     """
     Loads src/list.json and returns normalized Site objects.
     """
-    data = json.loads(SRC_LIST.read_text(encoding="utf-8"))
+    data = _loads(SRC_LIST.read_bytes())
     raw = data.get("sites", [])
 
     sites: list[Site] = []
@@ -78,49 +118,117 @@ def load_sites() -> list[Site]:
         if not name or not url:
             continue
 
-        sites.append(Site(name=name, url=url, category=category, tags=tags[:5]))
+        sites.append(
+            Site(name=name, url=url, category=category, tags=tags[:5], host=_hostname(url))
+        )
 
     # Stable ordering for deterministic builds
     sites.sort(key=lambda s: (s.category, s.name, s.url))
     return sites
 
 
-def build_category_options(sites: list[Site]) -> str:
+def _scan_sites(sites: list[Site]) -> tuple[list[str], list[str]]:
+    """
+    One pass over sites.
+    Returns (sorted unique categories, sorted unique hostnames), empties skipped.
+    """
+    cats: dict[str, None] = {}
+    hosts: dict[str, None] = {}
+    for s in sites:
+        if s.category:
+            cats[s.category] = None
+        if s.host:
+            hosts[s.host] = None
+    return sorted(cats), sorted(hosts)
+
+
+def build_category_options(cats: list[str]) -> str:
     """
     Builds <option> list for categories.
     """
-    cats = sorted({s.category for s in sites if s.category})
-    return "\n        ".join(f'<option value="{escape(c)}">{escape(c)}</option>' for c in cats)
+    return "\n        ".join([f'<option value="{e}">{e}</option>' for e in map(escape, cats)])
 
 
-def normalize_icon_to_rgb_white_bg(img: Image.Image) -> Image.Image:
+def _resample_filter(src_size: tuple[int, int], dst_size: tuple[int, int]) -> int:
+    """
+    LANCZOS only pays off for large reductions; near 1:1 it is indistinguishable
+    from BILINEAR at 24px and much slower. Exact integer reductions (48->24,
+    96->24, ...) use BOX, which is an exact area average there and the cheapest.
     """
-    Returns a ICON_SIZE x ICON_SIZE RGB image (no alpha).
-    If input has transparency, it is composited on white.
+    (w, h), (nw, nh) = src_size, dst_size
+    if w % nw == 0 and h % nh == 0 and w // nw == h // nh:
+        return Image.BOX
+    scale = nw / w
+    if 0.5 <= scale <= 2.0:
+        return Image.BILINEAR
+    if scale > 1.0:
+        return Image.BICUBIC
+    return Image.LANCZOS
+
+
+def _pixels(img_rgb: Image.Image) -> np.ndarray:
+    # One memcpy out of Pillow, viewed as (h, w, 3) uint8; no per-pixel objects
+    w, h = img_rgb.size
+    return np.frombuffer(img_rgb.tobytes(), dtype=np.uint8).reshape(h, w, 3)
+
+
+def _has_transparency(img: Image.Image) -> bool:
+    if "transparency" in img.info:
+        return True
+    bands = img.getbands()
+    if "A" in bands:
+        # Many favicons carry an alpha band that is fully opaque
+        return img.getchannel("A").getextrema() != (255, 255)
+    return "a" in bands  # premultiplied modes (RGBa, La)
+
+
+def normalize_icon_to_rgb_white_bg(img: Image.Image) -> tuple[Image.Image, np.ndarray]:
     """
-    rgba = img.convert("RGBA")
-    w, h = rgba.size
+    Returns a ICON_SIZE x ICON_SIZE RGB image (no alpha), plus its pixels as
+    a (ICON_SIZE, ICON_SIZE, 3) uint8 array for the color and sprite steps.
+    If input has transparency, it is composited on white; opaque input is
+    resized as RGB and pasted, skipping the alpha work.
+    """
+    opaque = not _has_transparency(img)
+    src = img.convert("RGB" if opaque else "RGBA")
+    w, h = src.size
     if w <= 0 or h <= 0:
-        return Image.new("RGB", (ICON_SIZE, ICON_SIZE), (255, 255, 255))
+        blank = Image.new("RGB", (ICON_SIZE, ICON_SIZE), (255, 255, 255))
+        return blank, _pixels(blank)
 
     # Resize to fit inside ICON_SIZE x ICON_SIZE
     scale = min(ICON_SIZE / w, ICON_SIZE / h)
     nw, nh = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
-    rgba = rgba.resize((nw, nh), Image.LANCZOS)
+    if (nw, nh) != (w, h):
+        src = src.resize((nw, nh), _resample_filter((w, h), (nw, nh)))
 
-    # White background canvas in RGBA to alpha-composite properly
-    canvas_rgba = Image.new("RGBA", (ICON_SIZE, ICON_SIZE), (255, 255, 255, 255))
     x = (ICON_SIZE - nw) // 2
     y = (ICON_SIZE - nh) // 2
-    canvas_rgba.alpha_composite(rgba, (x, y))
+
+    if opaque:
+        icon_rgb = Image.new("RGB", (ICON_SIZE, ICON_SIZE), (255, 255, 255))
+        icon_rgb.paste(src, (x, y))
+        return icon_rgb, _pixels(icon_rgb)
+
+    # White background canvas in RGBA to alpha-composite properly
+    canvas_rgba = Image.new("RGBA", (ICON_SIZE, ICON_SIZE), (255, 255, 255, 255))
+    canvas_rgba.alpha_composite(src, (x, y))
 
     # Convert to RGB (drop alpha)
-    return canvas_rgba.convert("RGB")
+    icon_rgb = canvas_rgba.convert("RGB")
+    return icon_rgb, _pixels(icon_rgb)
 
 
-def extract_dominant_color(img_rgb: Image.Image) -> str:
+# Per-channel class bits for extract_dominant_color: 1 = near-white, 2 = near-black
+_PIXEL_CLASS = np.zeros(256, dtype=np.uint8)
+_PIXEL_CLASS[246:] = 1
+_PIXEL_CLASS[:10] = 2
+_HEX = [f"{i:02x}" for i in range(256)]
+
+
+def extract_dominant_color(pixels: np.ndarray) -> str:
     """
-    Extracts a soft dominant color from an RGB icon image.
+    Extracts a soft dominant color from RGB icon pixels (..., 3) uint8.
     Strategy:
       - Ignore near-white pixels (background)
       - Ignore near-black pixels
@@ -128,40 +236,117 @@ def extract_dominant_color(img_rgb: Image.Image) -> str:
       - Pastelize by blending with white
     Returns a hex color like '#e6eef8'.
     """
-    pixels = list(img_rgb.getdata())
+    arr = pixels.reshape(-1, 3)
 
-    # Filter out near-white and near-black pixels
-    filtered = [
-        (r, g, b)
-        for (r, g, b) in pixels
-        if not (r > 245 and g > 245 and b > 245)
-        and not (r < 10 and g < 10 and b < 10)
-    ]
+    # Filter out near-white and near-black pixels: a pixel is dropped when all
+    # three channels share the same class bit.
+    cls = np.take(_PIXEL_CLASS, arr)
+    mask = (cls[:, 0] & cls[:, 1] & cls[:, 2]) == 0
+    sel = arr[mask]
 
-    if not filtered:
+    if sel.size == 0:
         return "#f3f4f6"  # neutral fallback
 
-    r = sum(p[0] for p in filtered) / len(filtered)
-    g = sum(p[1] for p in filtered) / len(filtered)
-    b = sum(p[2] for p in filtered) / len(filtered)
+    mean = sel.mean(axis=0)
 
     # Pastelize: blend with white (higher = softer)
     blend = 0.25
-    r = int(r + (255 - r) * blend)
-    g = int(g + (255 - g) * blend)
-    b = int(b + (255 - b) * blend)
+    r, g, b = (int(c) for c in mean + (255 - mean) * blend)
+
+    return "#" + _HEX[r] + _HEX[g] + _HEX[b]
 
-    return f"#{r:02x}{g:02x}{b:02x}"
 
+def _icon_cache_key(data: bytes) -> str:
+    # Pillow's version is part of the key: Pillow-SIMD (e.g. "12.1.1.post0") and
+    # stock Pillow resample to different pixels, and CI may fall back to either.
+    h = hashlib.blake2b(data, digest_size=16)
+    h.update(f"\0{ICON_SIZE}\0{ICON_CACHE_VERSION}\0{PIL.__version__}".encode("ascii"))
+    return h.hexdigest()
+
+
+def _read_cached_tile(key: str) -> bytes | None:
+    try:
+        rgb = (ICON_CACHE_DIR / f"{key}.raw").read_bytes()
+    except OSError:
+        return None
+    return rgb if len(rgb) == ICON_SIZE * ICON_SIZE * 3 else None
 
-def load_icons_by_hostnames(hostnames: list[str]) -> dict[str, tuple[Image.Image, str]]:
+
+def _write_cached_tile(key: str, rgb: bytes) -> None:
+    # Best-effort: an unwritable cache only means the icon is decoded next time
+    path = ICON_CACHE_DIR / f"{key}.raw"
+    tmp = path.with_suffix(".tmp")
+    try:
+        ICON_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(rgb)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _prune_icon_cache(keep: set[str]) -> None:
+    """
+    Deletes cached tiles this build did not use (changed or removed icons, an
+    older ICON_CACHE_VERSION or Pillow), so a restored CI cache does not grow.
+    """
+    try:
+        with os.scandir(ICON_CACHE_DIR) as it:
+            stale = [e.path for e in it if not (e.name.endswith(".raw") and e.name[:-4] in keep)]
+    except OSError:
+        return
+    for path in stale:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Read-only cache, stray subdirectory, ...
+
+
+def _tile_from_bytes(rgb: bytes) -> np.ndarray:
+    return np.frombuffer(rgb, dtype=np.uint8).reshape(ICON_SIZE, ICON_SIZE, 3)
+
+
+def _load_one(icon_path: Path) -> tuple[bytes, str] | None:
+    """
+    Decodes and normalizes one icon file (runs in a worker thread).
+    Returns (raw ICON_SIZE x ICON_SIZE RGB bytes, dominant_color_hex),
+    or None if it can't be read. Raw bytes are what the tile cache stores.
+    """
+    try:
+        with Image.open(icon_path) as img:
+            # JPEG data: let libjpeg scale down during decode. No-op for PNG.
+            img.draft("RGB", (ICON_SIZE * 2, ICON_SIZE * 2))
+            _icon_rgb, pixels = normalize_icon_to_rgb_white_bg(img)
+        return pixels.tobytes(), extract_dominant_color(pixels)
+    except Exception:
+        # Ignore unreadable/broken icon files; site will fall back to letter UI.
+        return None
+
+
+def load_icons_by_hostnames(
+    hostnames: list[str], use_cache: bool = True, used_keys: set[str] | None = None
+) -> dict[str, tuple[np.ndarray, str]]:
     """
     Icons are optional.
     File naming convention: <hostname>.png (exact hostname).
     Also supports 'www.' fallback: tries host, then host without 'www.'.
-    Returns dict: hostname -> (normalized RGB icon, dominant_color_hex)
+    With use_cache, normalized tiles are kept in .cache/icons/ keyed by a hash
+    of the file contents, so unchanged icons are not decoded and resized again
+    (also across clean checkouts, e.g. a restored CI cache). If a used_keys set
+    is given, the cache key of every icon found is added to it.
+    Returns dict: hostname -> (normalized RGB pixels (h, w, 3) uint8, dominant_color_hex)
     """
-    icons: dict[str, tuple[Image.Image, str]] = {}
+    icons: dict[str, tuple[np.ndarray, str]] = {}
+    # chosen_host -> (icon_path, cache_key) for icons that need decoding
+    pending: dict[str, tuple[Path, str]] = {}
+
+    # One directory scan instead of an exists() call per candidate
+    try:
+        with os.scandir(ICONS_DIR) as it:
+            available = {
+                e.name[:-4]: Path(e.path) for e in it if e.name.endswith(".png") and e.is_file()
+            }
+    except FileNotFoundError:
+        available = {}
 
     for host in hostnames:
         if not host:
@@ -175,8 +360,8 @@ def load_icons_by_hostnames(hostnames: list[str]) -> dict[str, tuple[Image.Image
         icon_path = None
         chosen_host = None
         for cand in candidates:
-            fp = ICONS_DIR / f"{cand}.png"
-            if fp.exists():
+            fp = available.get(cand)
+            if fp is not None:
                 icon_path = fp
                 chosen_host = cand
                 break
@@ -184,56 +369,162 @@ def load_icons_by_hostnames(hostnames: list[str]) -> dict[str, tuple[Image.Image
         if icon_path is None or chosen_host is None:
             continue
 
-        try:
-            img = Image.open(icon_path)
-            icon_rgb = normalize_icon_to_rgb_white_bg(img)
-            color = extract_dominant_color(icon_rgb)
-            icons[chosen_host] = (icon_rgb, color)
-        except Exception:
-            # Ignore unreadable/broken icon files; site will fall back to letter UI.
-            continue
+        key = ""
+        if use_cache:
+            try:
+                key = _icon_cache_key(icon_path.read_bytes())
+            except OSError:
+                # Unreadable icon file; site will fall back to letter UI.
+                continue
+            if used_keys is not None:
+                used_keys.add(key)
+        rgb = _read_cached_tile(key) if use_cache else None
+        if rgb is not None:
+            # Color is recomputed: cheap next to decode + resize
+            tile = _tile_from_bytes(rgb)
+            icons[chosen_host] = (tile, extract_dominant_color(tile))
+        else:
+            pending[chosen_host] = (icon_path, key)
+
+    if not pending:
+        return icons
+
+    # Decode + resize release the GIL, so threads scale across cores. No more
+    # workers than icons: incremental builds usually decode only one or two.
+    workers = min(os.cpu_count() or 1, len(pending))
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        results = ex.map(_load_one, (fp for fp, _key in pending.values()))
+        for (host, (_fp, key)), res in zip(pending.items(), results):
+            if res is None:
+                continue
+            rgb, color = res
+            icons[host] = (_tile_from_bytes(rgb), color)
+            if use_cache:
+                _write_cached_tile(key, rgb)
 
     return icons
 
 
-def save_sprite_to_data_uri(sprite_rgb: Image.Image) -> tuple[str, str]:
+# libimagequant gives the best palettes but is an optional Pillow feature
+_QUANTIZE = (
+    Image.Quantize.LIBIMAGEQUANT
+    if features.check_feature("libimagequant")
+    else Image.Quantize.FASTOCTREE
+)
+
+
+def _webp_lossy(sprite_rgb: Image.Image) -> memoryview:
+    buf = BytesIO()
+    sprite_rgb.save(
+        buf,
+        format="WEBP",
+        quality=SPRITE_WEBP_QUALITY,
+        method=SPRITE_WEBP_METHOD,
+    )
+    return buf.getbuffer()
+
+
+def _webp_palette(sprite_rgb: Image.Image) -> memoryview:
+    buf = BytesIO()
+    sprite_rgb.quantize(colors=256, method=_QUANTIZE).save(
+        buf,
+        format="WEBP",
+        lossless=True,
+        quality=50,  # lossless effort; higher costs seconds for ~1-3%
+        method=4,
+    )
+    return buf.getbuffer()
+
+
+def encode_sprite(sprite_rgb: Image.Image) -> tuple[memoryview, str]:
     """
     Tries WebP first; if not supported by the Pillow build, falls back to JPEG.
-    Returns (data_uri, mime).
+    Returns (encoded bytes, mime); the bytes are a zero-copy view of the
+    encoder's buffer.
     """
+    # Try WebP. The lossy and palette candidates are encoded concurrently;
+    # Pillow releases the GIL inside libwebp.
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        lossy = ex.submit(_webp_lossy, sprite_rgb)
+        palette = ex.submit(_webp_palette, sprite_rgb) if SPRITE_WEBP_TRY_PALETTE else None
+        try:
+            data = lossy.result()
+        except Exception:
+            data = None  # No usable WebP encoder
+        if data is not None and palette is not None:
+            # Optional candidate: if quantize() or the lossless save fails,
+            # keep the lossy WebP.
+            try:
+                alt = palette.result()
+            except Exception:
+                alt = None
+            if alt is not None and len(alt) < len(data):
+                data = alt
+    if data is not None:
+        return data, "image/webp"
+
+    # Fallback to JPEG (only when the lossy WebP encode itself failed)
     buf = BytesIO()
+    sprite_rgb.save(
+        buf,
+        format="JPEG",
+        quality=SPRITE_JPG_QUALITY,
+        optimize=True,
+        progressive=True,
+    )
+    return buf.getbuffer(), "image/jpeg"
 
-    # Try WebP
-    try:
-        sprite_rgb.save(
-            buf,
-            format="WEBP",
-            quality=SPRITE_WEBP_QUALITY,
-            method=2,  # higher compression effort
-        )
-        b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-        return f"data:image/webp;base64,{b64}", "image/webp"
-    except Exception:
-        # Fallback to JPEG
-        buf = BytesIO()
-        sprite_rgb.save(
-            buf,
-            format="JPEG",
-            quality=SPRITE_JPG_QUALITY,
-            optimize=True,
-            progressive=True,
-        )
-        b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-        return f"data:image/jpeg;base64,{b64}", "image/jpeg"
+
+def to_data_uri(data: bytes | memoryview, mime: str) -> bytes:
+    """
+    Returns the data URI as ASCII bytes, ready to be written into the page.
+    Binary payloads are base64-encoded. SVG and plain text are
+    percent-encoded instead: smaller, and they still compress well.
+    """
+    if mime.startswith("image/svg") or mime.startswith("text/"):
+        return f"data:{mime},{quote(str(data, 'utf-8'), safe=' /:;=,')}".encode("ascii")
+    # One buffer, never decoded to str (no base64 str + f-string copy either)
+    return b"".join((f"data:{mime};base64,".encode("ascii"), _b64encode(data)))
+
+
+def save_sprite(sprite_rgb: Image.Image) -> bytes:
+    """
+    Returns the CSS url for the sprite, as bytes.
+    Inline data URI unless the encoded sprite exceeds SPRITE_INLINE_MAX_BYTES;
+    then it is written next to index.html and referenced by relative URL.
+    """
+    data, mime = encode_sprite(sprite_rgb)
+
+    # Drop sprite files from earlier builds
+    for old in DIST_DIR.glob("sprite.*"):
+        old.unlink()
+
+    if SPRITE_INLINE_MAX_BYTES is None or len(data) <= SPRITE_INLINE_MAX_BYTES:
+        return to_data_uri(data, mime)
+
+    ext = "webp" if mime == "image/webp" else "jpg"
+    # Content-hashed name: unchanged sprites keep their URL (long-term caching)
+    name = f"sprite.{hashlib.blake2b(data, digest_size=8).hexdigest()}.{ext}"
+    DIST_DIR.mkdir(parents=True, exist_ok=True)
+    (DIST_DIR / name).write_bytes(data)
+    return name.encode("ascii")
+
+
+def _ink_pixels(pixels: np.ndarray) -> int:
+    """
+    Number of pixels that are not near-white; a cheap tile complexity proxy.
+    """
+    cls = np.take(_PIXEL_CLASS, pixels.reshape(-1, 3))
+    return int(((cls[:, 0] & cls[:, 1] & cls[:, 2]) != 1).sum())
 
 
 def build_sprite_and_positions(
-    icons: dict[str, tuple[Image.Image, str]]
-) -> tuple[str, str, dict[str, tuple[int, int]], dict[str, str]]:
+    icons: dict[str, tuple[np.ndarray, str]]
+) -> tuple[bytes, str, dict[str, tuple[int, int]], dict[str, str]]:
     """
     Builds a single RGB sprite (no alpha) on white background.
     Returns:
-      - sprite data URI
+      - sprite url as bytes (data URI, or file name if written externally)
       - background-size css (e.g. "288px 120px")
       - positions dict: hostname -> (x, y) in pixels
       - colors dict: hostname -> dominant_color_hex
@@ -241,106 +532,184 @@ def build_sprite_and_positions(
     if not icons:
         # Minimal 1x1 white image for safety
         blank = Image.new("RGB", (1, 1), (255, 255, 255))
-        data_uri, _mime = save_sprite_to_data_uri(blank)
-        return data_uri, "1px 1px", {}, {}
+        return save_sprite(blank), "1px 1px", {}, {}
 
     hosts = sorted(icons.keys())
-    n = len(hosts)
+
+    # Identical tiles (shared/mirrored icons) are packed once; the raw tile
+    # bytes are the key, so there are no hash collisions to worry about.
+    tile_index: dict[bytes, int] = {}
+    tiles: list[np.ndarray] = []
+    host_tile: dict[str, int] = {}
+    for host in hosts:
+        pixels = icons[host][0]
+        idx = tile_index.setdefault(pixels.tobytes(), len(tiles))
+        if idx == len(tiles):
+            tiles.append(pixels)
+        host_tile[host] = idx
+
+    # Mostly-white tiles first, busy ones last: similar tiles end up adjacent,
+    # which WebP compresses better than hostname order (~1.4% smaller here).
+    order = sorted(range(len(tiles)), key=lambda i: _ink_pixels(tiles[i]))
+    slot = {tile: pos for pos, tile in enumerate(order)}
+
+    n = len(tiles)
     cols = SPRITE_COLS
     rows = int(math.ceil(n / cols))
 
     sprite_w = cols * ICON_SIZE
     sprite_h = rows * ICON_SIZE
-    sprite = Image.new("RGB", (sprite_w, sprite_h), (255, 255, 255))
+    # Tiles are copied into one uint8 buffer (a plain memcpy per icon)
+    sprite_arr = np.full((sprite_h, sprite_w, 3), 255, dtype=np.uint8)
+
+    for idx, tile in enumerate(order):
+        x = (idx % cols) * ICON_SIZE
+        y = (idx // cols) * ICON_SIZE
+        sprite_arr[y : y + ICON_SIZE, x : x + ICON_SIZE] = tiles[tile]
 
     positions: dict[str, tuple[int, int]] = {}
     colors: dict[str, str] = {}
 
-    for idx, host in enumerate(hosts):
-        x = (idx % cols) * ICON_SIZE
-        y = (idx // cols) * ICON_SIZE
-        icon_img, color = icons[host]
-        sprite.paste(icon_img, (x, y))
-        positions[host] = (x, y)
-        colors[host] = color
+    for host in hosts:
+        idx = slot[host_tile[host]]
+        positions[host] = ((idx % cols) * ICON_SIZE, (idx // cols) * ICON_SIZE)
+        colors[host] = icons[host][1]
 
-    data_uri, _mime = save_sprite_to_data_uri(sprite)
+    sprite = Image.fromarray(sprite_arr)  # (h, w, 3) uint8 -> RGB
+    sprite_url = save_sprite(sprite)
     bg_size = f"{sprite_w}px {sprite_h}px"
-    return data_uri, bg_size, positions, colors
+    return sprite_url, bg_size, positions, colors
 
 
-def attach_icon_data_to_sites(
+def _icon_key(host: str, positions: dict[str, tuple[int, int]]) -> str | None:
+    """
+    Sprite key for a site's hostname, tried as-is and then without 'www.'.
+    """
+    if host in positions:
+        return host
+    host2 = _strip_www(host)
+    return host2 if host2 in positions else None
+
+
+def inputs_stamp() -> str:
+    """
+    Fingerprint of everything the output depends on: (path, mtime, size) of
+    list.json, the template, this script and every icon, plus SOURCE_DATE_EPOCH,
+    the Pillow version (resampled pixels) and whether orjson is used (JSON bytes).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    # Same filter as the icon scan: dangling *.png symlinks are not icons
+    icons = sorted(p for p in ICONS_DIR.glob("*.png") if p.is_file())
+    for p in [SRC_LIST, TEMPLATE, Path(__file__).resolve(), *icons]:
+        st = p.stat()
+        h.update(f"{p}\0{st.st_mtime_ns}\0{st.st_size}\n".encode("utf-8"))
+    h.update((os.environ.get("SOURCE_DATE_EPOCH") or "").encode("utf-8"))
+    h.update(f"\0{PIL.__version__}\0{orjson is not None}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _stamp_line(stamp: str) -> str:
+    # Also pins the output files (index.html and any external sprite), so a
+    # replaced/edited/deleted output is rebuilt.
+    parts = [stamp]
+    for p in [OUT_HTML, *sorted(DIST_DIR.glob("sprite.*"))]:
+        st = p.stat()
+        parts.append(f"{p.name} {st.st_mtime_ns} {st.st_size}")
+    return " ".join(parts)
+
+
+def _iter_sites_json(
     sites: list[Site],
     positions: dict[str, tuple[int, int]],
     colors: dict[str, str],
-) -> list[Site]:
+) -> Iterator[bytes]:
     """
-    Adds icon_x/icon_y/icon_color to sites if an icon exists.
-    It tries hostname as-is and also without 'www.' for matching.
+    Yields the SITES JSON array as UTF-8 chunks, one site at a time, so neither
+    a list of payload dicts nor the whole JSON string is held in memory.
+    icon_x/icon_y/icon_color come straight from the sprite positions/colors.
     """
-    out: list[Site] = []
-    for s in sites:
-        host = _hostname(s.url)
-        host2 = _strip_www(host)
+    # Resolved once per unique hostname (several sites can share one)
+    key_by_host: dict[str, str | None] = {}
 
-        key = None
-        if host in positions:
-            key = host
-        elif host2 in positions:
-            key = host2
-
-        if key is None:
-            out.append(s)
-            continue
-
-        x, y = positions[key]
-        color = colors.get(key)
-
-        out.append(
-            Site(
-                name=s.name,
-                url=s.url,
-                category=s.category,
-                tags=s.tags,
-                icon_x=x,
-                icon_y=y,
-                icon_color=color,
-            )
+    yield b"["
+    sep = b""
+    for s in sites:
+        if s.host not in key_by_host:
+            key_by_host[s.host] = _icon_key(s.host, positions)
+        key = key_by_host[s.host]
+        x, y = positions[key] if key is not None else (None, None)
+
+        yield sep
+        # Keep keys stable.
+        yield _dumps(
+            {
+                "name": s.name,
+                "url": s.url,
+                "category": s.category,
+                "tags": s.tags,
+                "icon_x": x,
+                "icon_y": y,
+                "icon_color": colors.get(key) if key is not None else None,
+            }
         )
-
-    return out
+        sep = b","
+    yield b"]"
 
 
 def main() -> None:
+    stamp = inputs_stamp()
+    try:
+        up_to_date = BUILD_STAMP.read_text(encoding="utf-8") == _stamp_line(stamp)
+    except OSError:  # no stamp or no output yet
+        up_to_date = False
+    if up_to_date:
+        print(f"Up to date: {OUT_HTML}")
+        return
+
     version = build_version_unix()
     sites = load_sites()
 
-    # Unique hostnames for icon lookup
-    hostnames = sorted({h for h in (_hostname(s.url) for s in sites) if h})
-
-    icons = load_icons_by_hostnames(hostnames)
-    sprite_data_uri, bg_size_css, positions, colors = build_sprite_and_positions(icons)
-
-    # Add icon positions + dominant color directly into SITES objects
-    sites_with_icons = attach_icon_data_to_sites(sites, positions, colors)
-
-    template = TEMPLATE.read_text(encoding="utf-8")
-
-    # Build the JS array. Keep keys stable.
-    sites_payload = [asdict(s) for s in sites_with_icons]
-
-    html = template
-    html = html.replace("__DATA__", json.dumps(sites_payload, ensure_ascii=False))
-    html = html.replace("__CATEGORIES__", build_category_options(sites_with_icons))
-    html = html.replace("__SPRITE_DATA_URI__", sprite_data_uri)
-    html = html.replace("__SPRITE_BG_SIZE__", bg_size_css)
-    html = html.replace("__BUILD_VERSION__", version)
-
-    # In case older templates still have this placeholder, neutralize it.
-    html = html.replace("__ICON_CSS_RULES__", "")
+    # Unique categories, and hostnames for icon lookup
+    categories, hostnames = _scan_sites(sites)
+
+    used_keys: set[str] = set()
+    icons = load_icons_by_hostnames(hostnames, used_keys=used_keys)
+    # Tiles no icon of this build maps to (changed/removed icons, older versions)
+    _prune_icon_cache(used_keys)
+    sprite_url, bg_size_css, positions, colors = build_sprite_and_positions(icons)
+
+    # Output is assembled as UTF-8 bytes: template and orjson output are
+    # written as-is, with no decode/encode round-trip.
+    template = TEMPLATE.read_bytes()
+
+    subs = {
+        b"__CATEGORIES__": build_category_options(categories).encode("utf-8"),
+        b"__SPRITE_DATA_URI__": sprite_url,
+        b"__SPRITE_BG_SIZE__": bg_size_css.encode("utf-8"),
+        b"__BUILD_VERSION__": version.encode("utf-8"),
+        # In case older templates still have this placeholder, neutralize it.
+        b"__ICON_CSS_RULES__": b"",
+    }
+    # Single pass over the template; substituted values are never rescanned.
+    # Chunks are written straight to the file, so the full page (sprite +
+    # payload) is never assembled as one string. __DATA__ (the SITES array)
+    # is streamed site by site.
+    pattern = re.compile(b"|".join(map(re.escape, [b"__DATA__", *subs])))
 
     DIST_DIR.mkdir(parents=True, exist_ok=True)
-    OUT_HTML.write_text(html, encoding="utf-8")
+    with OUT_HTML.open("wb", buffering=1 << 20) as f:
+        pos = 0
+        for m in pattern.finditer(template):
+            f.write(template[pos : m.start()])
+            token = m.group(0)
+            if token == b"__DATA__":
+                f.writelines(_iter_sites_json(sites, positions, colors))
+            else:
+                f.write(subs[token])
+            pos = m.end()
+        f.write(template[pos:])
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    BUILD_STAMP.write_text(_stamp_line(stamp), encoding="utf-8")
 
     print(f"Built: {OUT_HTML}")
     print(f"Build version: {version}")